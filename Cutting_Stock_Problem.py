@@ -1,225 +1,683 @@
 import streamlit as st
 from ortools.linear_solver import pywraplp
-from itertools import product
+from ortools.sat.python import cp_model
 import matplotlib.pyplot as plt
+from matplotlib import font_manager
+from matplotlib.figure import Figure
 import platform
-from collections import defaultdict
+import io
+import math
+import os
+from collections import Counter, namedtuple
 import pandas as pd
-import uuid
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba가 없으면 순수 파이썬 탐색으로 대체
+    HAS_NUMBA = False
 
 # --- 초기 설정 ---
 # 한글 폰트 설정
+_KOREAN_FONTS = {'Windows': 'Malgun Gothic', 'Darwin': 'AppleGothic'}  # 그 외(Linux)는 NanumGothic
+
+def _get_korean_font():
+    """운영체제에 맞는 한글 폰트 이름을 찾습니다. 설치되어 있지 않으면 None을 반환합니다."""
+    name = _KOREAN_FONTS.get(platform.system(), 'NanumGothic')
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return name if name in installed else None
+
 def set_korean_font():
     """운영체제에 맞는 한글 폰트를 설정합니다."""
-    system_name = platform.system()
-    if system_name == 'Windows':
-        plt.rcParams['font.family'] = 'Malgun Gothic'
-    elif system_name == 'Darwin': # macOS
-        plt.rcParams['font.family'] = 'AppleGothic'
-    else: # Linux
-        plt.rcParams['font.family'] = 'NanumGothic'
+    font = _get_korean_font()
+    if font:
+        plt.rcParams['font.family'] = font
     plt.rcParams['axes.unicode_minus'] = False
 
+@st.cache_resource
+def _init_matplotlib():
+    """Streamlit 재실행마다 rcParams를 다시 바꾸지 않도록 프로세스당 한 번만 폰트를 설정합니다."""
+    set_korean_font()
+    return True
+
 st.set_page_config(page_title="절단 최적화", layout="wide")
-set_korean_font()
+_init_matplotlib()
+
+# 품목별 막대 색상 (컬러맵은 한 번만 조회)
+_PALETTE = plt.get_cmap('Pastel1').colors
 
 # --- 세션 상태 관리 ---
+st.session_state.setdefault('_next_id', 0)
+
+def _nid():
+    """위젯 키에 쓸 세션 내 고유 번호를 발급합니다."""
+    st.session_state._next_id += 1
+    return st.session_state._next_id
+
 if 'item_list' not in st.session_state:
     st.session_state.item_list = [
-        {'id': str(uuid.uuid4()), 'name': 'A1', 'length': 1402, 'count': 24, 'over': 0},
-        {'id': str(uuid.uuid4()), 'name': 'A2', 'length': 2034, 'count': 21, 'over': 0},
-        {'id': str(uuid.uuid4()), 'name': 'A3', 'length': 1300, 'count': 54, 'over': 0},
+        {'id': _nid(), 'name': 'A1', 'length': 1402, 'count': 24, 'over': 0},
+        {'id': _nid(), 'name': 'A2', 'length': 2034, 'count': 21, 'over': 0},
+        {'id': _nid(), 'name': 'A3', 'length': 1300, 'count': 54, 'over': 0},
     ]
 if 'raw_material_list' not in st.session_state:
     st.session_state.raw_material_list = [
-        {'id': str(uuid.uuid4()), 'name': '원자재A', 'length': 6000, 'stock': 100},
-        {'id': str(uuid.uuid4()), 'name': '원자재B', 'length': 5000, 'stock': 100},
+        {'id': _nid(), 'name': '원자재A', 'length': 6000, 'stock': 100},
+        {'id': _nid(), 'name': '원자재B', 'length': 5000, 'stock': 100},
     ]
 
 # --- UI 함수 ---
 def add_item():
-    st.session_state.item_list.append({'id': str(uuid.uuid4()), 'name': '', 'length': 1000, 'count': 10, 'over': 0})
+    st.session_state.item_list.append({'id': _nid(), 'name': '', 'length': 1000, 'count': 10, 'over': 0})
 
 def delete_item(item_id):
     st.session_state.item_list = [item for item in st.session_state.item_list if item['id'] != item_id]
 
 def add_raw_material():
-    st.session_state.raw_material_list.append({'id': str(uuid.uuid4()), 'name': '', 'length': 6000, 'stock': 100})
+    st.session_state.raw_material_list.append({'id': _nid(), 'name': '', 'length': 6000, 'stock': 100})
 
 def delete_raw_material(raw_id):
     st.session_state.raw_material_list = [raw for raw in st.session_state.raw_material_list if raw['id'] != raw_id]
 
+def rows_from_widgets(rows, key_prefixes):
+    """행마다 위젯 키(접두사 + id)에 저장된 입력값을 {필드: 값} 목록으로 모읍니다. 이름이 빈 행은 제외합니다."""
+    result = []
+    for row in rows:
+        values = {field: st.session_state[f"{prefix}{row['id']}"] for field, prefix in key_prefixes.items()}
+        if values['name']:
+            result.append(values)
+    return result
+
 
 # --- UI 구성 ---
 st.title("✂️ 다중 원자재 절단 최적화")
 st.info("여러 종류의 원자재를 입력하고, 총 자투리를 최소화하는 최적의 조합을 찾습니다.")
 
-# --- 원자재 정보 입력 UI ---
-st.subheader("📦 원자재 정보")
-raw_header_cols = st.columns([3, 2, 2, 1])
-raw_header_cols[0].write("**원자재명**")
-raw_header_cols[1].write("**길이 (mm)**")
-raw_header_cols[2].write("**재고 수량**")
-
-raw_materials_to_process = []
-for raw in st.session_state.raw_material_list:
-    raw_cols = st.columns([3, 2, 2, 1])
-    raw['name'] = raw_cols[0].text_input("원자재명", value=raw['name'], key=f"raw_name_{raw['id']}", label_visibility="collapsed")
-    raw['length'] = raw_cols[1].number_input("길이", value=raw['length'], min_value=1, key=f"raw_length_{raw['id']}", label_visibility="collapsed")
-    raw['stock'] = raw_cols[2].number_input("재고", value=raw['stock'], min_value=1, key=f"raw_stock_{raw['id']}", label_visibility="collapsed")
-    raw_cols[3].button("➖", key=f"del_raw_{raw['id']}", on_click=delete_raw_material, args=(raw['id'],))
-    if raw['name']:
-        raw_materials_to_process.append(raw)
-st.button("➕ 원자재 추가", on_click=add_raw_material)
-st.markdown("---")
-
-# --- 품목 정보 입력 UI ---
-st.subheader("📋 생산 품목 정보")
-item_header_cols = st.columns([3, 2, 2, 2, 1])
-item_header_cols[0].write("**품목명**")
-item_header_cols[1].write("**길이 (mm)**")
-item_header_cols[2].write("**필수 수량**")
-item_header_cols[3].write("**허용 초과**")
-
-items_to_process = []
-for item in st.session_state.item_list:
-    item_cols = st.columns([3, 2, 2, 2, 1])
-    item['name'] = item_cols[0].text_input("품목명", value=item['name'], key=f"name_{item['id']}", label_visibility="collapsed")
-    item['length'] = item_cols[1].number_input("길이", value=item['length'], min_value=1, key=f"length_{item['id']}", label_visibility="collapsed")
-    item['count'] = item_cols[2].number_input("수량", value=item['count'], min_value=1, key=f"count_{item['id']}", label_visibility="collapsed")
-    item['over'] = item_cols[3].number_input("허용초과", value=item['over'], min_value=0, key=f"over_{item['id']}", label_visibility="collapsed")
-    item_cols[4].button("➖", key=f"del_item_{item['id']}", on_click=delete_item, args=(item['id'],))
-    if item['name']:
-        items_to_process.append(item)
-st.button("➕ 품목 추가", on_click=add_item)
-st.markdown("---")
-
-cut_margin = st.number_input("절단면 손실 (mm)", value=5, min_value=0, key="cut_margin")
-submitted = st.button("✅ 최적화 실행", type="primary")
+# 입력값은 폼으로 묶어 버튼을 누를 때만 반영 (입력할 때마다 재실행하지 않음)
+with st.form('inputs'):
+    # --- 원자재 정보 입력 UI ---
+    st.subheader("📦 원자재 정보")
+    raw_header_cols = st.columns([3, 2, 2, 1])
+    raw_header_cols[0].write("**원자재명**")
+    raw_header_cols[1].write("**길이 (mm)**")
+    raw_header_cols[2].write("**재고 수량**")
+
+    for raw in st.session_state.raw_material_list:
+        raw_cols = st.columns([3, 2, 2, 1])
+        raw_cols[0].text_input("원자재명", value=raw['name'], key=f"raw_name_{raw['id']}", label_visibility="collapsed")
+        raw_cols[1].number_input("길이", value=raw['length'], min_value=1, key=f"raw_length_{raw['id']}", label_visibility="collapsed")
+        raw_cols[2].number_input("재고", value=raw['stock'], min_value=1, key=f"raw_stock_{raw['id']}", label_visibility="collapsed")
+        raw_cols[3].form_submit_button("➖", key=f"del_raw_{raw['id']}", on_click=delete_raw_material, args=(raw['id'],))
+    st.form_submit_button("➕ 원자재 추가", on_click=add_raw_material)
+    st.markdown("---")
+
+    # --- 품목 정보 입력 UI ---
+    st.subheader("📋 생산 품목 정보")
+    item_header_cols = st.columns([3, 2, 2, 2, 1])
+    item_header_cols[0].write("**품목명**")
+    item_header_cols[1].write("**길이 (mm)**")
+    item_header_cols[2].write("**필수 수량**")
+    item_header_cols[3].write("**허용 초과**")
+
+    for item in st.session_state.item_list:
+        item_cols = st.columns([3, 2, 2, 2, 1])
+        item_cols[0].text_input("품목명", value=item['name'], key=f"name_{item['id']}", label_visibility="collapsed")
+        item_cols[1].number_input("길이", value=item['length'], min_value=1, key=f"length_{item['id']}", label_visibility="collapsed")
+        item_cols[2].number_input("수량", value=item['count'], min_value=1, key=f"count_{item['id']}", label_visibility="collapsed")
+        item_cols[3].number_input("허용초과", value=item['over'], min_value=0, key=f"over_{item['id']}", label_visibility="collapsed")
+        item_cols[4].form_submit_button("➖", key=f"del_item_{item['id']}", on_click=delete_item, args=(item['id'],))
+    st.form_submit_button("➕ 품목 추가", on_click=add_item)
+    st.markdown("---")
+
+    cut_margin = st.number_input("절단면 손실 (mm)", value=5, min_value=0, key="cut_margin")
+    submitted = st.form_submit_button("✅ 최적화 실행", type="primary")
 
 
 # --- 핵심 로직 ---
+# 전체 열거할 패턴 수의 상한 (초과하면 열 생성 사용, 환경 변수 CSP_ENUM_COMBO_LIMIT로 변경 가능)
+ENUM_COMBO_LIMIT = int(os.environ.get('CSP_ENUM_COMBO_LIMIT', 200_000))
+# 열 생성 반복 횟수 상한
+COLGEN_MAX_ITER = 500
+# CP-SAT 최대 풀이 시간 (초) - 넘으면 그때까지 찾은 가장 좋은 해를 사용
+SOLVER_TIME_LIMIT_SEC = 30
+# 자투리 하한 계산(원자재 개수 정수 문제)의 최대 풀이 시간 (초)
+WASTE_BOUND_TIME_LIMIT_SEC = 1
+
+# 절단 패턴: counts는 품목 순서대로의 개수 튜플, used_length는 절단면 손실을 포함한 사용 길이
+Pattern = namedtuple('Pattern', 'counts used_length')
+
+if HAS_NUMBA:
+    @njit(cache=True, boundscheck=False)
+    def _enum_patterns(steps, max_counts, max_raw_length, out_counts, out_used, limit):
+        """가능한 패턴 수를 반환하고, 버퍼 크기만큼 out_counts/out_used에 기록합니다. (limit개를 넘으면 그 자리에서 멈춤)"""
+        n = steps.shape[0]
+        capacity = out_counts.shape[0]
+        counts = np.zeros(n, np.int64)
+        used = 0
+        n_out = 0
+        while True:
+            # 마지막 품목부터 1개씩 늘리고, 최대 개수나 남은 길이를 넘으면 0으로 되돌려 앞 품목으로 올림
+            i = n - 1
+            while i >= 0 and (counts[i] >= max_counts[i] or used + steps[i] > max_raw_length):
+                used -= counts[i] * steps[i]
+                counts[i] = 0
+                i -= 1
+            if i < 0:
+                break
+            counts[i] += 1
+            used += steps[i]
+            if n_out < capacity:
+                out_counts[n_out, :] = counts
+                out_used[n_out] = used
+            n_out += 1
+            if n_out > limit:
+                break
+        return n_out
+
+# 열거 개수 제한 없음
+_NO_LIMIT = np.iinfo(np.int64).max
+
+def _pattern_bounds(items, max_raw_length, cut_margin):
+    """품목 1개당 차지하는 길이와 패턴 안의 품목별 최대 개수를 배열로 반환합니다."""
+    # 품목 1개당 차지하는 길이 (절단면 손실 포함)
+    steps = np.array([item['length'] + cut_margin for item in items], dtype=np.int64)
+    # 품목별 최대 개수: 원자재에 들어가는 개수와 허용 최대 수량(요구 수량 + 허용 초과) 중 작은 값
+    # (허용 최대 수량보다 많이 든 패턴은 한 번도 자를 수 없으므로 생성하지 않음)
+    max_allowed = np.array([item['count'] + item['over'] for item in items], dtype=np.int64)
+    return steps, np.minimum(max_raw_length // steps, max_allowed).astype(np.int32)
+
 def generate_patterns(items, max_raw_length, cut_margin):
-    """itertools.product를 사용하여 가능한 모든 절단 패턴을 생성합니다."""
-    max_counts = [(max_raw_length // item['length']) if item['length'] > 0 else 0 for item in items]
-    patterns = []
-    
-    for combo in product(*[range(m + 1) for m in max_counts]):
-        total_pieces = sum(combo)
-        if total_pieces == 0:
+    """원자재 길이에 들어가는 모든 품목 개수 조합을 Pattern으로 생성합니다."""
+    steps, max_counts = _pattern_bounds(items, max_raw_length, cut_margin)
+
+    if HAS_NUMBA:
+        capacity = 1 << 16
+        while True:
+            counts = np.empty((capacity, len(steps)), dtype=np.int32)
+            used = np.empty(capacity, dtype=np.int32)
+            n_out = _enum_patterns(steps, max_counts, max_raw_length, counts, used, _NO_LIMIT)
+            if n_out <= capacity:
+                break
+            # 버퍼가 부족하면 필요한 크기로 다시 탐색
+            capacity = n_out
+        counts, used = counts[:n_out], used[:n_out]
+    else:
+        # 품목을 하나씩 추가하며 조합을 벡터 연산으로 확장
+        # 각 조합을 남은 길이에 들어가는 개수(0..n_k-1)만큼만 복제하므로 길이를 넘는 조합은 만들지 않음
+        counts = np.zeros((1, 0), dtype=np.int32)
+        used = np.zeros(1, dtype=np.int64)
+        for step, max_count in zip(steps, max_counts):
+            n_k = np.minimum((max_raw_length - used) // step, max_count) + 1
+            rows = np.repeat(np.arange(len(used)), n_k)
+            ks = np.arange(len(rows)) - np.repeat(np.cumsum(n_k) - n_k, n_k)
+            counts = np.column_stack((counts[rows], ks.astype(np.int32)))
+            used = used[rows] + ks * step
+        # 아무 품목도 자르지 않은 조합은 제외
+        nonempty = used > 0
+        counts, used = counts[nonempty], used[nonempty]
+
+    # dict를 만들지 않고 패턴을 하나씩 넘겨 최적화 모델에 바로 등록
+    for row, used_length in zip(counts.tolist(), used.tolist()):
+        yield Pattern(tuple(row), used_length)
+
+def count_patterns(items, max_raw_length, cut_margin, limit):
+    """generate_patterns가 만들 패턴 수를 세되, limit개를 넘으면 더 세지 않고 limit + 1을 반환합니다.
+
+    열거는 길이를 넘는 조합을 건너뛰므로 비용은 상자 크기(∏(최대 개수 + 1))가 아니라 실제 패턴 수에 비례합니다.
+    """
+    steps, max_counts = _pattern_bounds(items, max_raw_length, cut_margin)
+    if HAS_NUMBA:
+        # 버퍼 없이 개수만 셈
+        n_out = _enum_patterns(steps, max_counts, max_raw_length,
+                               np.empty((0, len(steps)), dtype=np.int32), np.empty(0, dtype=np.int32), limit)
+        return min(n_out, limit + 1)
+    # generate_patterns의 NumPy 확장과 같되 사용 길이만 유지
+    # (각 조합은 0개를 포함해 1개 이상으로 복제되므로 조합 수는 줄지 않고, 한도를 넘는 즉시 멈춰도 됨)
+    used = np.zeros(1, dtype=np.int64)
+    for step, max_count in zip(steps, max_counts):
+        n_k = np.minimum((max_raw_length - used) // step, max_count) + 1
+        if n_k.sum() - 1 > limit:
+            return limit + 1
+        rows = np.repeat(np.arange(len(used)), n_k)
+        ks = np.arange(len(rows)) - np.repeat(np.cumsum(n_k) - n_k, n_k)
+        used = used[rows] + ks * step
+    # 아무 품목도 자르지 않은 조합은 제외
+    return min(len(used) - 1, limit + 1)
+
+def price_patterns(values, steps, max_counts, raw_lengths):
+    """원자재 길이마다 품목별 가치 합이 최대인 패턴을 유계 배낭 DP로 구해 (개수 목록, 사용 길이, 가치) 목록을 반환합니다.
+
+    DP 표는 가장 긴 원자재 길이까지 한 번만 채우고, 각 원자재 길이에서 역추적합니다.
+    max_counts는 가장 긴 원자재 기준 개수 상한이며, 짧은 원자재에서는 길이 제한이 개수를 자연히 줄입니다.
+    """
+    raw_length = max(raw_lengths)
+    # 품목별 개수 상한을 1, 2, 4, ... 묶음으로 나누어 0-1 배낭으로 변환 (가치가 없는 품목은 제외)
+    pieces = []
+    for k, (value, m) in enumerate(zip(values, max_counts)):
+        if value <= 0:
             continue
-        
-        pieces_length = sum(combo[i] * items[i]['length'] for i in range(len(items)))
-        cut_loss = cut_margin * total_pieces
-        total_len = pieces_length + cut_loss
-        
-        if total_len <= max_raw_length:
-            pattern = {items[i]['name']: combo[i] for i in range(len(items))}
-            pattern['used_length'] = total_len
-            patterns.append(pattern)
-            
-    return patterns
-
-def optimize_multi_raw(items, patterns, raw_materials):
-    """여러 종류의 원자재를 고려하여 총 자투리(waste)를 최소화하는 최적화를 수행합니다."""
-    solver = pywraplp.Solver.CreateSolver('SCIP')
-    
-    # 변수 생성: x_ij = 패턴 i를 원자재 j에서 자르는 횟수
-    x = {}
-    for i, p in enumerate(patterns):
-        for j, r in enumerate(raw_materials):
-            if p['used_length'] <= r['length']:
-                x[i, j] = solver.IntVar(0, solver.infinity(), f'x_{i}_{j}')
+        chunk = 1
+        while m > 0:
+            take = min(chunk, m)
+            pieces.append((k, take))
+            m -= take
+            chunk *= 2
+
+    # dp[c] = 길이 c 이하로 얻을 수 있는 최대 가치, taken[p, c] = 묶음 p를 넣었는지 여부
+    dp = np.zeros(raw_length + 1)
+    taken = np.zeros((len(pieces), raw_length + 1), dtype=bool)
+    for p, (k, n) in enumerate(pieces):
+        w = n * steps[k]
+        if w > raw_length:
+            continue
+        candidate = dp[:-w] + n * values[k]
+        better = candidate > dp[w:]
+        taken[p, w:] = better
+        dp[w:] = np.where(better, candidate, dp[w:])
+
+    results = []
+    for length in raw_lengths:
+        combo = [0] * len(values)
+        used_length = 0
+        c = length
+        for p in range(len(pieces) - 1, -1, -1):
+            if taken[p, c]:
+                k, n = pieces[p]
+                combo[k] += n
+                c -= n * steps[k]
+                used_length += n * steps[k]
+        results.append((combo, used_length, dp[length]))
+    return results
+
+def generate_patterns_colgen(items, raw_materials, cut_margin):
+    """열 생성으로 LP 완화 문제의 해에 필요한 Pattern만 생성합니다.
+
+    (Pattern 목록, 수렴 여부)를 반환합니다. 수렴했을 때만 이 패턴들의 LP 최적값이 전체 문제의 하한입니다.
+    """
+    if not raw_materials:
+        return [], True
+    steps = [item['length'] + cut_margin for item in items]
+    max_allowed = [item['count'] + item['over'] for item in items]
+    # 부족분을 허용하는 인공 변수의 벌점 (어떤 실제 해의 자투리 합보다 큼)
+    penalty = sum(r['length'] * r['stock'] for r in raw_materials) + 1
+
+    solver = pywraplp.Solver.CreateSolver('GLOP')
+    objective = solver.Objective()
+    demand = [solver.Constraint(item['count'], max_allowed[k]) for k, item in enumerate(items)]
+    stock = [solver.Constraint(0, r['stock']) for r in raw_materials]
+    for k in range(len(items)):
+        slack = solver.NumVar(0, solver.infinity(), f's_{k}')
+        demand[k].SetCoefficient(slack, 1)
+        objective.SetCoefficient(slack, penalty)
+    objective.SetMinimization()
+
+    # 가격 결정 DP는 모든 원자재 길이에 대해 한 번만 풂
+    raw_lengths = [r['length'] for r in raw_materials]
+    max_counts = [min(max(raw_lengths) // step, m) for step, m in zip(steps, max_allowed)]
 
-    # 제약 조건 1: 각 품목의 요구 수량 충족
+    patterns = []
+    seen = set()
+
+    def add_pattern(combo, used_length):
+        key = tuple(combo)
+        if key in seen or not any(combo):
+            return False
+        seen.add(key)
+        i = len(patterns)
+        patterns.append(Pattern(key, used_length))
+        nonzero = [(k, c) for k, c in enumerate(key) if c]
+        for j, r in enumerate(raw_materials):
+            if used_length <= r['length']:
+                var = solver.NumVar(0, solver.infinity(), f'x_{i}_{j}')
+                for k, c in nonzero:
+                    demand[k].SetCoefficient(var, c)
+                stock[j].SetCoefficient(var, 1)
+                objective.SetCoefficient(var, r['length'] - used_length)
+        return True
+
+    # 초기 패턴: 한 품목만 1개부터 들어가는 최대 개수까지 자르는 패턴 (가격 결정은 LP를 개선하는 열만 추가하므로
+    # 정수해의 수량 맞춤에 필요한 작은 패턴은 여기서 미리 넣어 둠)
+    for k, step in enumerate(steps):
+        for c in range(1, max_counts[k] + 1):
+            combo = [0] * len(items)
+            combo[k] = c
+            add_pattern(combo, c * step)
+
+    converged = False
+    for _ in range(COLGEN_MAX_ITER):
+        if solver.Solve() != pywraplp.Solver.OPTIMAL:
+            break
+        duals = [ct.dual_value() for ct in demand]
+        stock_duals = [ct.dual_value() for ct in stock]
+        # 패턴 가치 = 사용 길이 + 수요 쌍대가격 (자투리 감소분과 수요 충족 기여)
+        values = [step + dual for step, dual in zip(steps, duals)]
+        added = False
+        priced = price_patterns(values, steps, max_counts, raw_lengths)
+        for j, (r, (combo, used_length, value)) in enumerate(zip(raw_materials, priced)):
+            # 감소 비용 = 원자재 길이 - 재고 쌍대가격 - 패턴 가치 < 0 이면 추가
+            if r['length'] - stock_duals[j] - value < -1e-6:
+                added |= add_pattern(combo, used_length)
+        if not added:
+            converged = True
+            break
+
+    return patterns, converged
+
+def ffd_solution(items, raw_materials, cut_margin):
+    """First-Fit-Decreasing으로 (품목 개수 조합, 사용 길이, 원자재 번호)별 사용 횟수를 구합니다."""
+    order = sorted(range(len(items)), key=lambda k: items[k]['length'], reverse=True)
+    raw_order = sorted(range(len(raw_materials)), key=lambda j: raw_materials[j]['length'], reverse=True)
+    remaining_stock = [r['stock'] for r in raw_materials]
+    bins = []  # [원자재 번호, 남은 길이, 품목별 개수]
+
+    # 같은 품목은 한 개씩이 아니라 묶음으로 배치 (조각 수가 아니라 품목 수 × 원자재 수에 비례)
+    for k in order:
+        step = items[k]['length'] + cut_margin
+        left = items[k]['count']
+        for b in bins:
+            if left == 0:
+                break
+            take = min(left, b[1] // step)
+            if take:
+                b[1] -= take * step
+                b[2][k] += take
+                left -= take
+        while left > 0:
+            # 들어갈 자리가 없으면 재고가 남은 가장 긴 원자재를 새로 사용하고 들어가는 만큼 채움
+            j = next((j for j in raw_order if remaining_stock[j] > 0 and raw_materials[j]['length'] >= step), None)
+            if j is None:
+                return Counter()
+            remaining_stock[j] -= 1
+            take = min(left, raw_materials[j]['length'] // step)
+            counts = [0] * len(items)
+            counts[k] = take
+            bins.append([j, raw_materials[j]['length'] - take * step, counts])
+            left -= take
+
+    # 사용 길이 = 원자재 길이 - 남은 길이 (다시 합산하지 않음)
+    return Counter((tuple(counts), raw_materials[j]['length'] - rest, j) for j, rest, counts in bins)
+
+def lp_rounded_solution(items, raw_materials, cut_margin, columns):
+    """LP 완화 문제를 풀어 (내림한 LP 해 + 남은 수량의 FFD 해, LP 하한)을 반환합니다.
+
+    columns는 (Pattern, 원자재 번호) 목록입니다. 남은 수량을 재고 안에서 채우지 못하면 빈 Counter를 반환합니다.
+    """
+    # 열 행렬 A[열, 품목]과 열별 원자재 번호·자투리를 한 번에 만들어 두고 0이 아닌 계수만 등록
+    A = np.array([pattern.counts for pattern, _ in columns], dtype=np.int32).reshape(len(columns), len(items))
+    raw_index = np.array([j for _, j in columns], dtype=np.int64)
+    raw_lengths = np.array([r['length'] for r in raw_materials], dtype=np.int64)
+    wastes = raw_lengths[raw_index] - np.array([pattern.used_length for pattern, _ in columns], dtype=np.int64)
+
+    solver = pywraplp.Solver.CreateSolver('GLOP')
+    objective = solver.Objective()
+    demand = [solver.Constraint(item['count'], item['count'] + item['over']) for item in items]
+    stock = [solver.Constraint(0, r['stock']) for r in raw_materials]
+    xs = [solver.NumVar(0, solver.infinity(), '') for _ in columns]
+    for i, k in zip(*np.nonzero(A)):
+        demand[k].SetCoefficient(xs[i], int(A[i, k]))
+    for var, j, w in zip(xs, raw_index.tolist(), wastes.tolist()):
+        stock[j].SetCoefficient(var, 1)
+        objective.SetCoefficient(var, w)
+    objective.SetMinimization()
+    if solver.Solve() != pywraplp.Solver.OPTIMAL:
+        return Counter(), 0.0
+
+    n = np.floor(np.array([var.solution_value() for var in xs]) + 1e-6).astype(np.int64)
+    produced = (n @ A).tolist()
+    used_stock = np.bincount(raw_index, weights=n, minlength=len(raw_materials)).astype(np.int64).tolist()
+    rounded = Counter()
+    for i in np.flatnonzero(n > 0).tolist():
+        pattern, j = columns[i]
+        rounded[pattern.counts, pattern.used_length, j] = int(n[i])
+
+    # 내림으로 모자라게 된 수량만 남은 재고로 FFD 배치
+    residual_items = [dict(item, count=max(item['count'] - p, 0)) for item, p in zip(items, produced)]
+    residual_raws = [dict(r, stock=r['stock'] - u) for r, u in zip(raw_materials, used_stock)]
+    residual = ffd_solution(residual_items, residual_raws, cut_margin)
+    if not residual and any(item['count'] for item in residual_items):
+        return Counter(), objective.Value()
+    return rounded + residual, objective.Value()
+
+def reachable_lengths(items, max_raw_length, cut_margin):
+    """비트셋 DP로 가능한 패턴 사용 길이를 구합니다. (t번째 비트가 1이면 사용 길이 t가 가능)"""
+    mask = (1 << (max_raw_length + 1)) - 1
+    reachable = 1
     for item in items:
-        name = item['name']
-        min_required = item['count']
-        max_allowed = item['count'] + item['over']
-        
-        produced_amount = sum(x[i, j] * patterns[i].get(name, 0) for i, j in x)
-        solver.Add(produced_amount >= min_required)
-        solver.Add(produced_amount <= max_allowed)
+        step = item['length'] + cut_margin
+        # 최대 개수(허용 최대 수량 이하)를 1, 2, 4, ... 묶음으로 나누어 시프트 횟수를 log 단위로 줄임
+        remaining = min(max_raw_length // step, item['count'] + item['over'])
+        chunk = 1
+        while remaining > 0:
+            take = min(chunk, remaining)
+            reachable |= (reachable << (take * step)) & mask
+            remaining -= take
+            chunk *= 2
+    return reachable
+
+def max_fill_length(reachable, raw_length):
+    """원자재 길이 이하에서 가능한 가장 긴 패턴 사용 길이를 반환합니다. (0이면 자를 수 있는 품목 없음)"""
+    return (reachable & ((1 << (raw_length + 1)) - 1)).bit_length() - 1
+
+def waste_lower_bound(items, raw_materials, cut_margin):
+    """원자재별 최대 채움 길이로 총 자투리의 정수 하한을 구합니다.
+
+    원자재 j를 n_j개 쓰면 생산 길이는 Σ n_j·(최대 채움 길이_j) 이하이므로 최소 수량의 총 길이 이상이어야 하고,
+    총 자투리 = Σ n_j·(원자재 길이_j) - 생산 길이 >= Σ n_j·(원자재 길이_j) - (허용 최대 수량의 총 길이)입니다.
+    LP 완화와 달리 원자재 개수를 정수로 다루므로, 마지막 원자재 한 개를 통째로 더 써야 하는 경우를 잡아냅니다.
+    """
+    min_length = sum(item['count'] * (item['length'] + cut_margin) for item in items)
+    max_length = sum((item['count'] + item['over']) * (item['length'] + cut_margin) for item in items)
+    reachable = reachable_lengths(items, max(r['length'] for r in raw_materials), cut_margin)
+
+    model = cp_model.CpModel()
+    n = [model.new_int_var(0, r['stock'], f'n_{j}') for j, r in enumerate(raw_materials)]
+    fills = [max_fill_length(reachable, r['length']) for r in raw_materials]
+    model.add(cp_model.LinearExpr.weighted_sum(n, fills) >= min_length)
+    model.minimize(cp_model.LinearExpr.weighted_sum(n, [r['length'] for r in raw_materials]))
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = WASTE_BOUND_TIME_LIMIT_SEC
+    if solver.solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return 0
+    return max(math.ceil(solver.best_objective_bound - 1e-6) - max_length, 0)
+
+def optimize_multi_raw(items, patterns, raw_materials, cut_margin, complete_pool=True, lp_bound_valid=True):
+    """여러 종류의 원자재를 고려하여 총 자투리(waste)를 최소화하는 최적화를 수행합니다.
+
+    patterns는 Pattern을 순서대로 넘겨주는 이터러블이며, 받는 즉시 변수로 등록합니다.
+    (해 목록, 최적해 대비 갭)을 반환하며, 시간 제한 안에 최적성을 증명하면 갭은 0입니다.
+    complete_pool=False(열 생성 패턴만 사용)이면 정수해는 휴리스틱이므로 갭은 LP 하한과 waste_lower_bound로만 계산하고,
+    lp_bound_valid=False(열 생성 미수렴)이면 LP 하한은 쓰지 않습니다.
+    """
+    max_allowed = [item['count'] + item['over'] for item in items]
+    model = cp_model.CpModel()
+
+    # 변수 x_ij = 패턴 i를 원자재 j에서 자르는 횟수
+    # 상한 = min(원자재 재고, 패턴에 든 품목들의 허용 최대 수량 // 패턴 내 개수)
+    x = {}
+    registered = []
+    demand_vars = [[] for _ in items]
+    demand_coeffs = [[] for _ in items]
+    stock_terms = [[] for _ in raw_materials]
+    wastes = []
+
+    def add_column(counts, used_length):
+        i = len(registered)
+        registered.append(Pattern(counts, used_length))
+        # 0이 아닌 계수만 모아 원자재마다 다시 훑지 않음
+        nonzero = [(k, c) for k, c in enumerate(counts) if c]
+        pattern_ub = min(max_allowed[k] // c for k, c in nonzero)
+        if pattern_ub == 0:
+            # 한 번만 잘라도 허용 최대 수량을 넘는 패턴은 변수를 만들지 않음
+            return i
+        for j, r in enumerate(raw_materials):
+            if used_length <= r['length']:
+                var = model.new_int_var(0, min(r['stock'], pattern_ub), f'x_{i}_{j}')
+                x[i, j] = var
+                for k, c in nonzero:
+                    demand_vars[k].append(var)
+                    demand_coeffs[k].append(c)
+                stock_terms[j].append(var)
+                wastes.append(r['length'] - used_length)
+        return i
+
+    for counts, used_length in patterns:
+        add_column(counts, used_length)
+    pattern_index = {p.counts: i for i, p in enumerate(registered)}
+
+    # 초기 해 힌트: FFD 해와 LP 완화 해를 내림한 뒤 남은 수량을 FFD로 채운 해 중 자투리가 적은 쪽
+    def hint_waste(solution_counts):
+        return sum(n * (raw_materials[j]['length'] - used_length) for (_, used_length, j), n in solution_counts.items())
+
+    hint = ffd_solution(items, raw_materials, cut_margin)
+    lp_hint, lp_bound = lp_rounded_solution(items, raw_materials, cut_margin, [(registered[i], j) for i, j in x])
+    if lp_hint and (not hint or hint_waste(lp_hint) < hint_waste(hint)):
+        hint = lp_hint
+    # 패턴 목록에 없는 힌트 패턴은 추가
+    for counts, used_length, _ in hint:
+        if counts not in pattern_index:
+            pattern_index[counts] = add_column(counts, used_length)
+
+    # 제약 조건 1: 각 품목의 요구 수량 충족 (요구 수량 <= 생산량 <= 요구 수량 + 허용 초과)
+    for k, item in enumerate(items):
+        produced_amount = cp_model.LinearExpr.weighted_sum(demand_vars[k], demand_coeffs[k])
+        model.add_linear_constraint(produced_amount, item['count'], item['count'] + item['over'])
 
     # 제약 조건 2: 각 원자재의 재고 수량 초과 불가
     for j, r in enumerate(raw_materials):
-        used_stock = sum(x[i, j] for i in range(len(patterns)) if (i, j) in x)
-        solver.Add(used_stock <= r['stock'])
+        model.add(cp_model.LinearExpr.sum(stock_terms[j]) <= r['stock'])
         
     # 목표 함수: 총 자투리(waste) 최소화
-    total_waste = sum(x[i, j] * (raw_materials[j]['length'] - patterns[i]['used_length']) for i, j in x)
-    solver.Minimize(total_waste)
+    total_waste = cp_model.LinearExpr.weighted_sum(list(x.values()), wastes)
+    model.minimize(total_waste)
+    # 전체 문제의 자투리 하한을 제약으로 넣어, 해가 하한에 닿으면 바로 최적성이 증명되게 함
+    waste_bound = waste_lower_bound(items, raw_materials, cut_margin) if raw_materials else 0
+    model.add(total_waste >= waste_bound)
+
+    hint_counts = {(pattern_index[counts], j): n for (counts, _, j), n in hint.items()}
+    for key, var in x.items():
+        model.add_hint(var, hint_counts.get(key, 0))
     
-    status = solver.Solve()
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = os.cpu_count() or 8
+    solver.parameters.max_time_in_seconds = SOLVER_TIME_LIMIT_SEC
+    status = solver.solve(model)
     
     solution = []
-    if status == pywraplp.Solver.OPTIMAL:
+    gap = 0.0
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        objective_value = solver.objective_value
+        if not complete_pool:
+            # CP-SAT의 하한은 제한된 패턴 목록 기준이라 전체 문제의 하한이 아님 (자투리는 정수이므로 LP 하한은 올림)
+            best_bound = max(math.ceil(lp_bound - 1e-6) if lp_bound_valid else 0, waste_bound)
+            gap = max(objective_value - best_bound, 0) / max(objective_value, 1)
+        elif status == cp_model.FEASIBLE:
+            best_bound = max(solver.best_objective_bound, lp_bound, waste_bound)
+            gap = max(objective_value - best_bound, 0) / max(objective_value, 1)
         for (i, j), var in x.items():
-            count = int(var.solution_value())
+            count = solver.value(var)
             if count > 0:
                 solution.append({
-                    'pattern': patterns[i],
+                    'pattern': registered[i],
                     'count': count,
                     'raw_material': raw_materials[j]
                 })
-    return solution
+    return solution, gap
+
+def _from_specs(specs, fields):
+    """캐시 키로 쓰는 튜플을 다시 dict 목록으로 변환합니다."""
+    return [dict(zip(fields, spec)) for spec in specs]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_solution(item_specs, raw_specs, cut_margin):
+    """(이름, 길이, 수량, 허용초과) / (이름, 길이, 재고) 튜플을 키로 최적화 결과를 캐시합니다."""
+    items = _from_specs(item_specs, ('name', 'length', 'count', 'over'))
+    raw_materials = _from_specs(raw_specs, ('name', 'length', 'stock'))
+    max_raw_length = max(r['length'] for r in raw_materials)
+    if count_patterns(items, max_raw_length, cut_margin, ENUM_COMBO_LIMIT) <= ENUM_COMBO_LIMIT:
+        return optimize_multi_raw(items, generate_patterns(items, max_raw_length, cut_margin), raw_materials, cut_margin)
+    patterns, converged = generate_patterns_colgen(items, raw_materials, cut_margin)
+    return optimize_multi_raw(items, patterns, raw_materials, cut_margin, complete_pool=False, lp_bound_valid=converged)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_cutting_png(solution_specs, item_specs, max_overall_length, cut_margin):
+    """(품목 개수 조합, 사용 길이, 원자재명, 원자재 길이, 사용 횟수) 튜플들로 절단 패턴 그림을 그려 PNG 바이트로 반환합니다.
+
+    입력이 같으면 그리기와 PNG 변환(savefig)을 모두 건너뜁니다. 호출마다 pyplot에 등록하지 않은 새 Figure를 써서
+    세션 간에 Figure를 공유하지 않습니다.
+    """
+    # 패턴마다 서브플롯을 만들지 않고 하나의 축에 y 위치를 한 칸씩 옮겨 그림
+    fig = Figure(figsize=(10, len(solution_specs) * 0.8))
+    ax = fig.subplots()
+
+    # 품목명 순서의 (이름, 품목 번호, 길이, 색상)을 한 번만 만들어 패턴마다 재사용
+    item_order = sorted((name, k, length, _PALETTE[k % len(_PALETTE)]) for k, (name, length) in enumerate(item_specs))
+    # 글자가 들어갈 만큼 넓은 조각에만 라벨 표시
+    min_label_width = max_overall_length * 0.04
+
+    for idx, (counts, used_length, raw_name, raw_length, count) in enumerate(solution_specs):
+        # 막대는 y=idx-0.2 ~ idx+0.3, 제목은 막대 바로 위 (y축은 위에서 아래로 증가)
+        y = idx + 0.05
+        pos = 0
 
-def show_cutting_visual(solution, items, all_raw_materials, cut_margin):
-    """절단 패턴을 시각화합니다."""
-    if not solution: return
+        # 패턴의 모든 조각을 broken_barh 한 번으로 그림
+        segments = []
+        colors = []
+        labels = []
+        for name, k, length, color in item_order:
+            for _ in range(counts[k]):
+                segments.append((pos, length))
+                colors.append(color)
+                if length >= min_label_width:
+                    labels.append((pos + length / 2, f"{name}\n({length})"))
+                pos += length
+                pos += cut_margin
 
-    max_overall_length = max(r['length'] for r in all_raw_materials) if all_raw_materials else 6000
+        ax.broken_barh(segments, (y - 0.25, 0.5), facecolors=colors, edgecolor='black', linewidth=0.5)
 
-    sorted_solution = sorted(solution, key=lambda s: s['count'], reverse=True)
+        # 잔재는 빗금 친 조각 하나로 추가
+        leftover = raw_length - used_length
+        if leftover > 0.1:
+            ax.broken_barh([(used_length, leftover)], (y - 0.25, 0.5), facecolors='lightgray', hatch='//', edgecolor='gray')
+            if leftover >= min_label_width:
+                labels.append((used_length + leftover / 2, f"잔재\n({leftover:.0f})"))
 
-    fig, axes = plt.subplots(len(sorted_solution), 1, figsize=(10, len(sorted_solution) * 0.8), squeeze=False)
-    axes = axes.flatten()
+        for x, label in labels:
+            ax.annotate(label, (x, y), va='center', ha='center', fontsize=8, color='black')
 
-    color_map = plt.cm.get_cmap('Pastel1', len(items))
-    item_colors = {item['name']: color_map(i) for i, item in enumerate(items)}
+        title = f"패턴-{idx+1:02d} (원자재: {raw_name}) (🔁 {count}회 / 사용: {used_length}mm / 잔재: {raw_length - used_length}mm)"
+        ax.text(0, idx - 0.25, title, va='bottom', ha='left', fontsize=10)
 
-    for idx, sol in enumerate(sorted_solution):
-        ax = axes[idx]
-        pos = 0
-        pattern = sol['pattern']
-        count = sol['count']
-        raw_material = sol['raw_material']
-        raw_length = raw_material['length']
-        used_length = pattern['used_length']
-        
-        pattern_items = sorted((name, qty) for name, qty in pattern.items() if isinstance(qty, int) and qty > 0)
-        
-        for name, qty in pattern_items:
-            try:
-                length = next(i['length'] for i in items if i['name'] == name)
-            except StopIteration: continue
-
-            for _ in range(qty):
-                ax.barh(0, length, left=pos, color=item_colors.get(name, 'gray'), edgecolor='black', linewidth=0.5)
-                ax.text(pos + length / 2, 0, f"{name}\n({length})", va='center', ha='center', fontsize=8, color='black')
-                pos += length
-                pos += cut_margin
-        
-        # *** 수정: 잔재 계산 및 시각화 로직 단순화 및 수정 ***
-        leftover = raw_length - used_length
-        start_of_leftover = used_length
-        
-        if leftover > 0.1:
-            ax.barh(0, leftover, left=start_of_leftover, color='lightgray', hatch='//', edgecolor='gray')
-            ax.text(start_of_leftover + leftover / 2, 0, f"잔재\n({leftover:.0f})", va='center', ha='center', fontsize=8, color='black')
+    ax.set_xlim(0, max_overall_length)
+    ax.set_ylim(len(solution_specs) - 0.6, -0.6)
+    ax.axis('off')
+    fig.subplots_adjust(left=0.02, right=0.98, top=0.98, bottom=0.02)
+    # st.pyplot의 기본 저장 옵션과 같게 저장
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
 
-        ax.set_xlim(0, max_overall_length)
-        ax.set_yticks([])
-        title = f"패턴-{idx+1:02d} (원자재: {raw_material['name']}) (🔁 {count}회 / 사용: {used_length}mm / 잔재: {raw_length - used_length}mm)"
-        ax.set_title(title, loc='left', fontsize=10)
-        ax.axis('off')
+def show_cutting_visual(solution, items, all_raw_materials, cut_margin):
+    """절단 패턴을 시각화합니다."""
+    if not solution: return
 
-    plt.tight_layout(pad=2.0)
-    st.pyplot(fig)
+    max_overall_length = max(r['length'] for r in all_raw_materials) if all_raw_materials else 6000
+
+    sorted_solution = sorted(solution, key=lambda s: s['count'], reverse=True)
+    solution_specs = tuple(
+        (sol['pattern'].counts, sol['pattern'].used_length, sol['raw_material']['name'], sol['raw_material']['length'], sol['count'])
+        for sol in sorted_solution
+    )
+    item_specs = tuple((item['name'], item['length']) for item in items)
+    st.image(render_cutting_png(solution_specs, item_specs, max_overall_length, cut_margin), width='stretch')
 
 
 # --- 실행 로직 ---
 if submitted:
+    # 입력값은 제출할 때만 위젯 상태에서 읽음
+    raw_materials_to_process = rows_from_widgets(st.session_state.raw_material_list, {'name': 'raw_name_', 'length': 'raw_length_', 'stock': 'raw_stock_'})
+    items_to_process = rows_from_widgets(st.session_state.item_list, {'name': 'name_', 'length': 'length_', 'count': 'count_', 'over': 'over_'})
+
     # 입력 유효성 검사
     item_names = [item['name'] for item in items_to_process]
     raw_names = [raw['name'] for raw in raw_materials_to_process]
@@ -232,58 +690,52 @@ if submitted:
     else:
         try:
             with st.spinner("최적화 중입니다... (품목/원자재 수가 많으면 오래 걸릴 수 있습니다)"):
+                item_specs = tuple((item['name'], item['length'], item['count'], item['over']) for item in items_to_process)
+                raw_specs = tuple((raw['name'], raw['length'], raw['stock']) for raw in raw_materials_to_process)
                 max_raw_length = max(r['length'] for r in raw_materials_to_process)
-                patterns = generate_patterns(items_to_process, max_raw_length, cut_margin)
                 
-                if not patterns:
+                # 가장 짧은 품목도 가장 긴 원자재에 들어가지 않으면 패턴이 하나도 없음
+                if min(item['length'] for item in items_to_process) + cut_margin > max_raw_length:
                     st.error("❌ 유효한 절단 패턴을 생성할 수 없습니다.")
                 else:
-                    solution = optimize_multi_raw(items_to_process, patterns, raw_materials_to_process)
+                    if count_patterns(items_to_process, max_raw_length, cut_margin, ENUM_COMBO_LIMIT) > ENUM_COMBO_LIMIT:
+                        st.info(f"ℹ️ 가능한 절단 패턴이 전체 열거 한도({ENUM_COMBO_LIMIT:,}개)를 넘어, 열 생성으로 필요한 패턴만 만듭니다.")
+                    solution, gap = cached_solution(item_specs, raw_specs, cut_margin)
                     if not solution:
                         st.error("❌ 최적화 실패: 조건에 맞는 결과가 없습니다.")
                     else:
-                        st.success(f"✅ 최적화 완료!")
+                        if gap > 0:
+                            st.warning(f"⏱️ 최적해임을 증명하지 못해 찾은 가장 좋은 해를 표시합니다. (풀이 시간 {SOLVER_TIME_LIMIT_SEC}초 제한 또는 열 생성 패턴만 사용, 최적해 대비 갭 최대 {gap:.1%})")
+                        else:
+                            st.success(f"✅ 최적화 완료!")
                         
                         # --- 결과 분석 및 표시 ---
                         st.subheader("📊 품목별 생산 분석")
-                        actual_counts = {name: 0 for name in item_names}
-                        for sol in solution:
-                            for name, qty in sol['pattern'].items():
-                                if name in actual_counts:
-                                    actual_counts[name] += qty * sol['count']
-                        
-                        diff_data = []
-                        for item in items_to_process:
-                            actual = actual_counts[item['name']]
-                            required = item['count']
-                            diff = actual - required
-                            status = "✅ 충족" if diff == 0 else ("🔼 초과" if diff > 0 else "❌ 부족")
-                            diff_data.append([item['name'], required, actual, status, diff])
-                        
-                        diff_df = pd.DataFrame(diff_data, columns=["품목", "요구 수량", "생산 수량", "상태", "차이"])
+                        # 생산 수량 = 패턴 행렬 A[해, 품목]^T @ 해별 사용 횟수
+                        A = np.array([sol['pattern'].counts for sol in solution], dtype=np.int64)
+                        sol_counts = np.array([sol['count'] for sol in solution], dtype=np.int64)
+                        actual = sol_counts @ A
+                        required = np.array([item['count'] for item in items_to_process], dtype=np.int64)
+                        diff = actual - required
+                        status = np.select([diff == 0, diff > 0], ["✅ 충족", "🔼 초과"], "❌ 부족")
+
+                        diff_df = pd.DataFrame({"품목": item_names, "요구 수량": required, "생산 수량": actual, "상태": status, "차이": diff})
                         st.dataframe(diff_df, use_container_width=True, hide_index=True)
 
                         st.subheader("📘 절단 패턴 요약")
-                        summary_data = []
-                        for sol in solution:
-                            pattern = sol['pattern']
-                            raw_material = sol['raw_material']
-                            pattern_desc = ", ".join(f"{name}={qty}" for name, qty in pattern.items() if isinstance(qty, int) and qty > 0)
-                            used_length = pattern['used_length']
-                            summary_data.append({
-                                "원자재": raw_material['name'],
-                                "패턴 구성": pattern_desc,
-                                "사용 횟수": sol['count'],
-                                "사용 길이": used_length,
-                                "자투리": raw_material['length'] - used_length
-                            })
-                        
-                        summary_df = pd.DataFrame(summary_data)
-                        if not summary_df.empty:
-                            summary_df = summary_df.sort_values(by=["원자재", "사용 횟수"], ascending=[True, False]).reset_index(drop=True)
-
-                        columns_order = ["원자재", "패턴 구성", "사용 횟수", "사용 길이", "자투리"]
-                        st.dataframe(summary_df[columns_order], use_container_width=True, hide_index=True)
+                        # 열 단위로 만들고 자투리는 배열 연산으로 계산
+                        pattern_descs = [", ".join(f"{name}={qty}" for name, qty in zip(item_names, sol['pattern'].counts) if qty > 0) for sol in solution]
+                        used_lengths = np.array([sol['pattern'].used_length for sol in solution], dtype=np.int64)
+                        raw_lengths = np.array([sol['raw_material']['length'] for sol in solution], dtype=np.int64)
+                        summary_df = pd.DataFrame({
+                            "원자재": [sol['raw_material']['name'] for sol in solution],
+                            "패턴 구성": pattern_descs,
+                            "사용 횟수": sol_counts,
+                            "사용 길이": used_lengths,
+                            "자투리": raw_lengths - used_lengths,
+                        })
+                        summary_df = summary_df.sort_values(by=["원자재", "사용 횟수"], ascending=[True, False], kind='stable', ignore_index=True)
+                        st.dataframe(summary_df, use_container_width=True, hide_index=True)
 
                         st.subheader("📐 절단 시각화")
                         show_cutting_visual(solution, items_to_process, raw_materials_to_process, cut_margin)